@@ -1,67 +1,218 @@
 import streamlit as st
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
-from prompts import SYSTEM_PROMPT
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from prompts import build_prompt
 from pydub import AudioSegment # Import pydub
-import math
+from pydub.silence import detect_nonsilent
 from io import BytesIO # Import BytesIO
+import asyncio
+import time
+import hashlib
+
+# Settings (and the .env file) are loaded by config, shared with app_improved.py.
+# It raises on a missing API key; show that in the page instead of a traceback.
+try:
+    from config import config
+except ValueError:
+    st.error("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+    st.stop()
 
-# Load environment variables from .env file
-load_dotenv()
+from utils import HTTP_LIMITS, get_openai_client, hash_upload_chunked, init_session_state, logger
 
 # Set page config
-st.set_page_config(page_title="Audio Transcription App", layout="wide")
+st.set_page_config(page_title=config.ui.page_title, layout=config.ui.layout)
 
 st.title("Audio Transcription with OpenAI")
 
-# Get API key from environment variable
-api_key = os.getenv("OPENAI_API_KEY")
-
-if not api_key:
-    st.error("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+try:
+    client = get_openai_client()
+except Exception as e:
+    st.error(f"Failed to initialize OpenAI client: {e}")
     st.stop()
 
-client = OpenAI(api_key=api_key)
-
 # --- Constants ---
-MAX_DURATION_SECONDS = 600 # Max duration per chunk (10 minutes)
+MAX_DURATION_SECONDS = config.transcription.max_duration_seconds # Max duration per chunk (10 minutes)
+MAX_CONCURRENT_REQUESTS = 4 # Chunks transcribed in parallel
+STREAM_REFRESH_SECONDS = 0.1 # Minimum interval between live transcript redraws
+PARTIAL_REFRESH_SECONDS = 0.2 # Minimum interval between partial chunked-transcript redraws
+SILENCE_MIN_MS = 500 # Shortest pause that counts as a split point
+SILENCE_THRESHOLD_DB = 16 # Pause = this many dB below the file's average loudness
+SILENCE_SEEK_STEP_MS = 50 # Resolution of the silence scan
+RESULT_CACHE_MAX_ENTRIES = 32 # Transcripts and summaries kept for repeated clicks
+# Chunks are encoded as Opus in a WebM container: much cheaper to encode than MP3 and
+# smaller on the wire. WebM (not Ogg) because it is on the API's accepted upload list.
+# WAV uploads get WAV chunks instead, which pydub reads and writes with the stdlib
+# wave module, so the whole WAV path runs without spawning ffmpeg. At 16 kHz mono
+# 16-bit a full 600s chunk is ~19 MB, inside the 25 MB upload limit.
+CHUNK_EXPORT_OPTIONS = {
+    "webm": {"codec": "libopus", "parameters": ["-application", "voip", "-b:a", "16k"]},
+    "wav": {}
+}
+TRANSCRIPTION_FRAME_RATE = 16000 # The models work on 16 kHz mono; anything above is wasted upload
+
+@st.cache_resource
+def get_results_cache():
+    """Process-wide transcript/summary cache keyed by content hash and request settings."""
+    return {}
+
+def remember_result(key, value):
+    """Store a result, evicting the oldest entries past RESULT_CACHE_MAX_ENTRIES."""
+    results_cache = get_results_cache()
+    results_cache[key] = value
+    while len(results_cache) > RESULT_CACHE_MAX_ENTRIES:
+        results_cache.pop(next(iter(results_cache)))
+
+def content_hash(data):
+    """SHA-256 hex digest used to key cached results by content."""
+    return hashlib.sha256(data).hexdigest()
+
+def plan_chunks(audio):
+    """Split audio into (start_ms, end_ms) windows of at most MAX_DURATION_SECONDS.
+
+    Windows are packed greedily and end in the middle of a detected pause, so
+    words aren't cut at the boundary. Speech that runs longer than a window
+    without pausing falls back to a hard cut.
+    """
+    max_chunk_ms = MAX_DURATION_SECONDS * 1000
+    speech_ranges = detect_nonsilent(
+        audio,
+        min_silence_len=SILENCE_MIN_MS,
+        silence_thresh=audio.dBFS - SILENCE_THRESHOLD_DB,
+        seek_step=SILENCE_SEEK_STEP_MS
+    )
+    # Candidate cut points: the middle of each pause between speech ranges
+    pause_midpoints = [
+        (previous_end + next_start) // 2
+        for (_, previous_end), (next_start, _) in zip(speech_ranges, speech_ranges[1:])
+    ]
+
+    spans = []
+    start_ms = 0
+    best_cut = None # Latest pause that still fits in the current window
+    for cut_ms in pause_midpoints + [len(audio)]:
+        while cut_ms - start_ms > max_chunk_ms:
+            end_ms = best_cut if best_cut is not None else start_ms + max_chunk_ms
+            spans.append((start_ms, end_ms))
+            start_ms, best_cut = end_ms, None
+        best_cut = cut_ms
+    spans.append((start_ms, len(audio)))
+    return spans
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def upload_content_hash(file_id, _uploaded_file):
+    """Hash an upload's content once per file_id, reading it block-wise instead of via getvalue()."""
+    return hash_upload_chunked(_uploaded_file)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_audio(file_id, _uploaded_file, audio_format=None):
+    """Decode an upload to 16 kHz mono 16-bit once; reruns and repeated clicks reuse the result."""
+    # Keyed on the upload's file_id (the leading underscore keeps the file object out of the hash).
+    # cache_resource returns the same read-only AudioSegment instead of unpickling a PCM copy per hit.
+    # audio_format="wav" makes pydub parse the file itself instead of probing it with ffmpeg.
+    _uploaded_file.seek(0)
+    audio = AudioSegment.from_file(_uploaded_file, format=audio_format)
+    return audio.set_frame_rate(TRANSCRIPTION_FRAME_RATE).set_channels(1).set_sample_width(2)
+
+async def transcribe_chunk(async_client, index, chunk_bytes, chunk_format, prompt, model, language):
+    """Transcribe one exported chunk with the async client."""
+    response_text = await async_client.audio.transcriptions.create(
+        model=model,
+        file=(f"chunk_{index+1}.{chunk_format}", chunk_bytes),
+        response_format="text",
+        language=language,
+        prompt=prompt
+    )
+
+    logger.debug(f"Chunk {index+1} transcribed: {len(response_text)} characters")
+
+    return str(response_text) if response_text is not None else ""
+
+def export_chunk(chunk, chunk_bytes_io, chunk_format):
+    """Encode a chunk into the shared export buffer and return a bytes snapshot of it."""
+    chunk_bytes_io.seek(0)
+    chunk_bytes_io.truncate(0)
+    chunk.export(chunk_bytes_io, format=chunk_format, **CHUNK_EXPORT_OPTIONS[chunk_format])
+    return chunk_bytes_io.getvalue()
+
+async def transcribe_chunks(chunk_jobs, chunk_format, model, language, status_placeholder, preview_placeholder):
+    """Encode and transcribe all chunks as a pipeline; returns texts in chunk order.
+
+    A producer encodes chunks one at a time in a worker thread while up to
+    MAX_CONCURRENT_REQUESTS consumers upload them, so ffmpeg encoding overlaps
+    with the network round-trips. The bounded queue caps how many encoded
+    chunks are held in memory at once. Finished chunks are shown in
+    preview_placeholder as they arrive, with markers for the ones still pending.
+    """
+    queue = asyncio.Queue(maxsize=2)
+    transcript_parts = [None] * len(chunk_jobs)
+    completed_chunks = 0
+    last_refresh = 0.0
+
+    async def produce():
+        chunk_bytes_io = BytesIO() # One export buffer reused for every chunk
+        for index, chunk, prompt in chunk_jobs:
+            chunk_bytes = await asyncio.to_thread(export_chunk, chunk, chunk_bytes_io, chunk_format)
+            await queue.put((index, chunk_bytes, prompt))
+        for _ in range(MAX_CONCURRENT_REQUESTS):
+            await queue.put(None) # One stop marker per consumer
+
+    def show_partial_transcript():
+        nonlocal last_refresh
+        now = time.monotonic()
+        if now - last_refresh < PARTIAL_REFRESH_SECONDS:
+            return
+        last_refresh = now
+        preview_placeholder.code(
+            " ".join(part if part is not None else f"[chunk {j+1} pending...]" for j, part in enumerate(transcript_parts)),
+            language=None
+        )
+
+    async def consume():
+        nonlocal completed_chunks
+        while (job := await queue.get()) is not None:
+            index, chunk_bytes, prompt = job
+            transcript_parts[index] = await transcribe_chunk(
+                async_client, index, chunk_bytes, chunk_format, prompt, model, language
+            )
+            completed_chunks += 1
+            status_placeholder.info(f"Transcribed {completed_chunks}/{len(chunk_jobs)} chunks...")
+            show_partial_transcript()
+
+    # The async client is bound to this asyncio.run() event loop, so unlike the sync client
+    # it can't be cached across reruns; it is opened per batch and closed when done
+    async with AsyncOpenAI(
+        api_key=config.openai_api_key,
+        http_client=DefaultAsyncHttpxClient(http2=True, limits=HTTP_LIMITS)
+    ) as async_client:
+        await asyncio.gather(produce(), *(consume() for _ in range(MAX_CONCURRENT_REQUESTS)))
+    return transcript_parts
 
 # Initialize session state variables if they don't exist
-if 'transcript' not in st.session_state:
-    st.session_state.transcript = None
-if 'summary' not in st.session_state:
-    st.session_state.summary = None
-if 'edited_transcript' not in st.session_state:
-    st.session_state.edited_transcript = None
-if 'uploaded_file_name' not in st.session_state: # Store filename for context
-    st.session_state.uploaded_file_name = None
-if 'meeting_description_state' not in st.session_state:
-    st.session_state.meeting_description_state = "A conversation about ..."
-if 'language_state' not in st.session_state:
-    st.session_state.language_state = "it" # Default to Italian
+init_session_state()
 
 # --- UI Elements ---
-uploaded_file = st.file_uploader(
-    "Upload an audio file",
-    type=["mp3", "mp4", "mpeg", "mpga", "m4a", "wav", "webm"],
-    key="audio_uploader" # Add key for potential resets
-)
-model_choice = st.selectbox("Choose transcription model", ["gpt-4o-mini-transcribe", "gpt-4o-transcribe"], index=1)
-st.session_state.meeting_description_state = st.text_area(
-    "Optional description of the meeting",
-    value=st.session_state.meeting_description_state,
-    key="meeting_desc_input"
-)
-# Add language selection
-st.session_state.language_state = st.selectbox(
-    "Select Audio Language",
-    options=["it", "en", "es", "fr", "de", "auto"], # Add more as needed, 'auto' might try detection but explicit is better
-    index=["it", "en", "es", "fr", "de", "auto"].index(st.session_state.language_state), # Keep selection
-    format_func=lambda x: {"it": "Italian", "en": "English", "es": "Spanish", "fr": "French", "de": "German", "auto": "Auto-detect"}.get(x, x),
-    key="language_select"
-)
-transcribe_button = st.button("Transcribe Audio")
+# Inputs live in a form so typing a description or changing a dropdown does not rerun
+# the whole script; everything is submitted together with the Transcribe button.
+with st.form("transcribe_form"):
+    uploaded_file = st.file_uploader(
+        "Upload an audio file",
+        type=config.formats.upload_types,
+        key="audio_uploader" # Add key for potential resets
+    )
+    model_choice = st.selectbox("Choose transcription model", ["gpt-4o-mini-transcribe", "gpt-4o-transcribe"], index=1)
+    st.session_state.meeting_description_state = st.text_area(
+        "Optional description of the meeting",
+        value=st.session_state.meeting_description_state,
+        key="meeting_desc_input"
+    )
+    # Add language selection
+    st.session_state.language_state = st.selectbox(
+        "Select Audio Language",
+        options=config.language_options, # 'auto' might try detection but explicit is better
+        index=config.language_options.index(st.session_state.language_state), # Keep selection
+        format_func=config.get_language_display_name,
+        key="language_select"
+    )
+    transcribe_button = st.form_submit_button("Transcribe Audio")
 
 # Placeholders for dynamic UI updates
 transcription_status_placeholder = st.empty()
@@ -82,71 +233,80 @@ if transcribe_button:
         full_transcript = "" # Initialize here
 
         try:
-            # Load audio file with pydub
-            audio_bytes = uploaded_file.getvalue()
-            audio = AudioSegment.from_file(BytesIO(audio_bytes))
-            
-            # --- Prepend small silence --- 
-            transcription_status_placeholder.info("Prepending small silence...")
-            silence_duration_ms = 100 # Add 100ms of silence
-            silence_segment = AudioSegment.silent(duration=silence_duration_ms)
-            audio = silence_segment + audio
-            # --- End prepending silence ---
+            # Load audio file with pydub straight from the upload buffer (no getvalue() copy),
+            # cached per upload so it is only decoded once. WAV stays on the ffmpeg-free path.
+            is_wav = uploaded_file.name.lower().endswith(".wav")
+            audio = load_audio(uploaded_file.file_id, uploaded_file, "wav" if is_wav else None)
             
-            duration_seconds = len(audio) / 1000 # Update duration after adding silence
+            # No silence padding: the models do their own voice activity detection
+            total_frames = int(audio.frame_count())
+            duration_seconds = total_frames / audio.frame_rate
+
+            # Same file + settings as an earlier run: reuse that transcript instead of paying again
+            transcript_key = (
+                "transcript",
+                upload_content_hash(uploaded_file.file_id, uploaded_file),
+                model_choice,
+                st.session_state.language_state,
+                st.session_state.meeting_description_state
+            )
+            cached_transcript = get_results_cache().get(transcript_key)
+
+            if cached_transcript is not None:
+                transcription_status_placeholder.info("Reusing the previous transcription of this file...")
+                full_transcript = cached_transcript
 
             # Check if splitting is needed
-            if duration_seconds > MAX_DURATION_SECONDS:
+            elif duration_seconds > MAX_DURATION_SECONDS:
                 transcription_status_placeholder.info(f"Audio duration ({duration_seconds:.2f}s) exceeds limit. Splitting into chunks...")
-                num_chunks = math.ceil(duration_seconds / MAX_DURATION_SECONDS)
-                chunk_length_ms = MAX_DURATION_SECONDS * 1000
+                chunk_spans = plan_chunks(audio)
+                num_chunks = len(chunk_spans)
                 
-                transcript_parts = [] 
-                previous_chunk_text = ""
-
-                for i in range(num_chunks):
-                    start_ms = i * chunk_length_ms
-                    end_ms = min((i + 1) * chunk_length_ms, len(audio))
-                    chunk = audio[start_ms:end_ms]
+                language = st.session_state.language_state if st.session_state.language_state != "auto" else None
+
+                # Chunks no longer see the previous chunk's text (it isn't known yet when
+                # requests run concurrently), so the prompt carries the meeting description
+                # and part index instead.
+                # Chunks are built from frame offsets into a memoryview of the decoded PCM,
+                # so slicing doesn't copy each chunk's share of the buffer (audio[a:b] does).
+                pcm_view = memoryview(audio.raw_data)
+
+                chunk_jobs = []
+                for i, (start_ms, end_ms) in enumerate(chunk_spans):
+                    start_frame = start_ms * audio.frame_rate // 1000
+                    end_frame = min(end_ms * audio.frame_rate // 1000, total_frames)
+                    chunk = AudioSegment(
+                        data=pcm_view[start_frame * audio.frame_width:end_frame * audio.frame_width],
+                        sample_width=audio.sample_width,
+                        frame_rate=audio.frame_rate,
+                        channels=audio.channels
+                    )
 
-                    transcription_status_placeholder.info(f"Transcribing chunk {i+1}/{num_chunks}...")
+                    context_prompt = f"You are listening to: {st.session_state.meeting_description_state}. This is part {i+1} of {num_chunks}."
+                    chunk_jobs.append((i, chunk, context_prompt))
 
-                    # Export chunk to MP3 format
-                    chunk_bytes_io = BytesIO()
-                    chunk.export(chunk_bytes_io, format="mp3")
-                    chunk_bytes_io.seek(0)
+                transcription_status_placeholder.info(f"Transcribing {num_chunks} chunks...")
 
-                    context_prompt = f"You are listening to: {st.session_state.meeting_description_state}. This is part {i+1} of {num_chunks}."
-                    if previous_chunk_text:
-                        context_prompt += f" The previous part ended with: '{' '.join(previous_chunk_text.split()[-50:])}'"
-
-                    response_text = client.audio.transcriptions.create(
-                        model=model_choice,
-                        file=(f"chunk_{i+1}.mp3", chunk_bytes_io),
-                        response_format="text",
-                        language=st.session_state.language_state if st.session_state.language_state != "auto" else None,
-                        prompt=context_prompt
+                # --- Encode and transcribe chunks in parallel ---
+                partial_transcript_placeholder = st.empty()
+                transcript_parts = asyncio.run(
+                    transcribe_chunks(
+                        chunk_jobs, "wav" if is_wav else "webm", model_choice, language,
+                        transcription_status_placeholder, partial_transcript_placeholder
                     )
-                    
-                    print(f"DEBUG: Chunk {i+1} response received (length {len(response_text)}):")
-                    print(f"DEBUG: Chunk {i+1} START: {response_text[:100]}...")
-                    print(f"DEBUG: Chunk {i+1} END: ...{response_text[-100:]}")
-                    
-                    current_chunk_text = str(response_text) if response_text is not None else ""
-                    transcript_parts.append(current_chunk_text)
-                    previous_chunk_text = current_chunk_text
-                # --- (End of existing chunk processing logic) ---
+                )
+                partial_transcript_placeholder.empty()
+                # --- (End of parallel chunk processing) ---
                 
                 # Join parts after the loop
                 full_transcript = " ".join(transcript_parts)
 
-                print(f"DEBUG: Combined transcript length: {len(full_transcript)}")
-                print(f"DEBUG: Combined transcript START: {full_transcript[:200]}...")
-                print(f"DEBUG: Combined transcript END: ...{full_transcript[-200:]}")
+                logger.debug(f"Combined transcript: {len(full_transcript)} characters")
 
             else:
                 # Use streaming for shorter files
                 transcription_status_placeholder.info("Transcription started (streaming)...")
+                uploaded_file.seek(0) # pydub (or st.audio) may have moved the read position
                 stream = client.audio.transcriptions.create(
                     model=model_choice,
                     file=uploaded_file,
@@ -159,25 +319,24 @@ if transcribe_button:
                 # Use a temporary placeholder just for streaming output
                 temp_stream_placeholder = st.empty()
                 streamed_text = "" # Accumulate streamed text locally
+                last_refresh = 0.0 # Redraws are throttled; each one re-sends the whole text
                 for event in stream:
-                    chunk = ""
-                    if hasattr(event, 'delta') and event.delta:
-                        chunk = event.delta
-                    elif hasattr(event, 'text') and event.text:
-                        chunk = event.text
-
-                    if chunk:
-                        streamed_text += chunk
-                        temp_stream_placeholder.markdown(
-                            f"""**Transcription (Streaming):**
-```
-{streamed_text}
-```"""
-                        )
+                    if getattr(event, 'type', None) == "transcript.text.done":
+                        # The done event carries the full text, not another delta
+                        streamed_text = event.text or streamed_text
+                    elif getattr(event, 'delta', None):
+                        streamed_text += event.delta
+                        now = time.monotonic()
+                        if now - last_refresh < STREAM_REFRESH_SECONDS:
+                            continue
+                        last_refresh = now
+                        # Plain code block: no Markdown parse of the growing text on each redraw
+                        temp_stream_placeholder.code(streamed_text, language=None)
                 full_transcript = streamed_text # Assign accumulated streamed text
                 temp_stream_placeholder.empty() # Clear the temporary placeholder
 
             # --- Set session state AFTER successful transcription (chunked or streamed) ---
+            remember_result(transcript_key, full_transcript)
             st.session_state.transcript = full_transcript.strip()
             st.session_state.edited_transcript = st.session_state.transcript
             transcription_status_placeholder.success("Transcription complete!")
@@ -197,11 +356,7 @@ if transcribe_button:
 if st.session_state.transcript is not None:
     st.markdown("---")
     st.subheader("Final Transcript")
-    st.markdown(f"""
-```
-{st.session_state.transcript}
-```
-""")
+    st.code(st.session_state.transcript, language=None)
 
     st.markdown("---")
     st.subheader("Edit Transcript & Generate Summary")
@@ -220,29 +375,55 @@ if st.session_state.transcript is not None:
             st.info("Generating summary...")
             summary_placeholder = st.empty()
             try:
-                audio_description = f"Meeting description: {st.session_state.meeting_description_state}"
-                # Map language code to full name for the prompt
-                language_map = {
-                    "it": "Italian", "en": "English", "es": "Spanish", 
-                    "fr": "French", "de": "German", "auto": "the language detected in the transcript"
-                }
-                selected_language_name = language_map.get(st.session_state.language_state, st.session_state.language_state)
-                
-                formatted_prompt = SYSTEM_PROMPT.format(
-                    audio_description=audio_description,
-                    transcript=st.session_state.edited_transcript,
-                    language=selected_language_name # Pass the language name here
+                summary_key = (
+                    "summary",
+                    content_hash(st.session_state.edited_transcript.encode("utf-8")),
+                    st.session_state.language_state,
+                    st.session_state.meeting_description_state
                 )
+                cached_summary = get_results_cache().get(summary_key)
+
+                if cached_summary is not None:
+                    st.session_state.summary = cached_summary
+                else:
+                    audio_description = f"Meeting description: {st.session_state.meeting_description_state}"
+                    # Map language code to full name for the prompt
+                    language_map = {
+                        "it": "Italian", "en": "English", "es": "Spanish", 
+                        "fr": "French", "de": "German", "auto": "the language detected in the transcript"
+                    }
+                    selected_language_name = language_map.get(st.session_state.language_state, st.session_state.language_state)
+                
+                    formatted_prompt = build_prompt(
+                        audio_description=audio_description,
+                        transcript=st.session_state.edited_transcript,
+                        language=selected_language_name # Pass the language name here
+                    )
 
-                response = client.chat.completions.create(
-                    model="gpt-4.1", # Use a powerful model for summarizing potentially long text
-                    messages=[
-                        {"role": "system", "content": formatted_prompt},
-                        {"role": "user", "content": "Please generate the meeting notes and key insights based on the provided transcript and context."}
-                    ],
-                    temperature=0.5,
-                )
-                st.session_state.summary = response.choices[0].message.content
+                    stream = client.chat.completions.create(
+                        model="gpt-4.1", # Use a powerful model for summarizing potentially long text
+                        messages=[
+                            {"role": "system", "content": formatted_prompt},
+                            {"role": "user", "content": "Please generate the meeting notes and key insights based on the provided transcript and context."}
+                        ],
+                        temperature=0.5,
+                        stream=True
+                    )
+
+                    # Show the summary as it is generated, with the same redraw throttling as transcription
+                    streamed_summary = ""
+                    last_refresh = 0.0
+                    for event in stream:
+                        delta = event.choices[0].delta.content if event.choices else None
+                        if delta:
+                            streamed_summary += delta
+                            now = time.monotonic()
+                            if now - last_refresh < STREAM_REFRESH_SECONDS:
+                                continue
+                            last_refresh = now
+                            summary_placeholder.markdown(streamed_summary)
+                    st.session_state.summary = streamed_summary
+                    remember_result(summary_key, st.session_state.summary)
                 summary_placeholder.success("Summary generated!")
 
             except Exception as e:
@@ -3,22 +3,30 @@ Improved Audio Transcription App with better architecture and error handling.
 """
 import streamlit as st
 import math
-from openai import OpenAI
+import hashlib
 from io import BytesIO
 
 from config import config
 from utils import (
     validate_audio_file, 
     preprocess_audio, 
+    probe_duration_seconds,
     create_smart_chunks,
-    transcribe_chunk,
+    transcribe_chunks_concurrently,
     create_progress_bar,
     update_progress,
+    throttled,
+    get_chunk_cache,
     estimate_processing_time,
-    export_transcript,
+    export_transcript_file,
+    get_openai_client,
+    init_session_state,
+    build_summary_batch_request,
+    submit_summary_batch,
+    fetch_batch_summaries,
     logger
 )
-from prompts import SYSTEM_PROMPT
+from prompts import build_prompt
 
 # Set page config
 st.set_page_config(
@@ -40,30 +48,39 @@ st.markdown("---")
 
 # Initialize OpenAI client
 try:
-    client = OpenAI(api_key=config.openai_api_key)
+    client = get_openai_client()
 except Exception as e:
     st.error(f"Failed to initialize OpenAI client: {e}")
     st.stop()
 
 # Initialize session state
-def init_session_state():
-    """Initialize session state variables."""
-    defaults = {
-        'transcript': None,
-        'summary': None,
-        'edited_transcript': None,
-        'uploaded_file_name': None,
-        'meeting_description_state': config.ui.default_description,
-        'language_state': config.ui.default_language,
-        'processing': False
-    }
-    
-    for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
-
 init_session_state()
 
+@st.cache_resource(show_spinner=False, max_entries=4)
+def cached_preprocess_audio(audio_hash: str, _audio_bytes: bytes):
+    """Decode an upload once; File Analysis and Transcribe share the result."""
+    # Keyed on the upload's content hash; the underscore keeps Streamlit from
+    # re-hashing the whole file on every call. cache_resource hands back the
+    # same AudioSegment instead of unpickling a copy of the PCM on every hit;
+    # nothing mutates it (chunking only takes views)
+    return preprocess_audio(_audio_bytes)
+
+def get_summary_prompt() -> str:
+    """Fill the summary prompt, reusing the last one while its inputs are unchanged."""
+    prompt_key = (
+        st.session_state.meeting_description_state,
+        st.session_state.edited_transcript,
+        st.session_state.language_state
+    )
+    if st.session_state.summary_prompt_key != prompt_key:
+        st.session_state.summary_prompt = build_prompt(
+            audio_description=f"Meeting description: {st.session_state.meeting_description_state}",
+            transcript=st.session_state.edited_transcript,
+            language=config.get_language_display_name(st.session_state.language_state)
+        )
+        st.session_state.summary_prompt_key = prompt_key
+    return st.session_state.summary_prompt
+
 # Sidebar with settings
 with st.sidebar:
     st.header("⚙️ Settings")
@@ -75,6 +92,12 @@ with st.sidebar:
     with st.expander("📋 Supported Formats"):
         st.write(", ".join(config.formats.upload_types))
     
+    # Batch mode
+    batch_mode = st.toggle(
+        "⚡ Batch mode",
+        help="Queue summaries and run them through the OpenAI Batch API (half price, results within 24h)"
+    )
+    
     # Debug mode
     if config.debug:
         st.warning("🐛 Debug mode enabled")
@@ -99,7 +122,17 @@ with st.container():
                 st.error(f"❌ {error_msg}")
                 uploaded_file = None
             else:
-                file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
+                # getvalue() copies the whole buffer; keep one copy per upload
+                # and hash that copy rather than reading the upload a second time
+                if st.session_state.audio_bytes_key != uploaded_file.file_id:
+                    st.session_state.audio_bytes = uploaded_file.getvalue()
+                    st.session_state.audio_hash = hashlib.blake2b(
+                        st.session_state.audio_bytes, digest_size=16
+                    ).hexdigest()
+                    # Probed once per upload, not on every rerun
+                    st.session_state.audio_duration = probe_duration_seconds(st.session_state.audio_bytes)
+                    st.session_state.audio_bytes_key = uploaded_file.file_id
+                file_size_mb = len(st.session_state.audio_bytes) / (1024 * 1024)
                 st.success(f"✅ {uploaded_file.name} ({file_size_mb:.1f}MB)")
     
     with col2:
@@ -153,9 +186,10 @@ st.header("4️⃣ Start Transcription")
 if uploaded_file and not st.session_state.processing:
     with st.expander("📊 File Analysis", expanded=False):
         try:
-            audio_bytes = uploaded_file.getvalue()
-            audio = preprocess_audio(audio_bytes)
-            duration_seconds = len(audio) / 1000
+            audio_bytes = st.session_state.audio_bytes
+            duration_seconds = st.session_state.audio_duration
+            if duration_seconds is None:
+                duration_seconds = len(cached_preprocess_audio(st.session_state.audio_hash, audio_bytes)) / 1000
             
             estimated_time = estimate_processing_time(duration_seconds)
             needs_chunking = duration_seconds > config.transcription.max_duration_seconds
@@ -201,50 +235,41 @@ if transcribe_button and uploaded_file:
         with st.container():
             st.info("🔄 Processing audio...")
             
-            # Preprocess audio
-            audio_bytes = uploaded_file.getvalue()
-            audio = preprocess_audio(audio_bytes)
-            duration_seconds = len(audio) / 1000
-            
-            # Processing indicator
-            st.balloons() if not st.session_state.processing else None
+            # Only chunked files need decoding; short ones go to the API as uploaded
+            audio_bytes = st.session_state.audio_bytes
+            duration_seconds = st.session_state.audio_duration
+            if duration_seconds is None:
+                duration_seconds = len(cached_preprocess_audio(st.session_state.audio_hash, audio_bytes)) / 1000
             
             # Determine processing strategy
             max_duration_ms = config.transcription.max_duration_seconds * 1000
             
-            if len(audio) > max_duration_ms:
+            if duration_seconds > config.transcription.max_duration_seconds:
                 # Chunked processing
                 st.info(f"📊 Processing {duration_seconds:.1f}s audio in chunks...")
                 
+                audio = cached_preprocess_audio(st.session_state.audio_hash, audio_bytes)
                 chunks = create_smart_chunks(audio, max_duration_ms)
                 progress_bar, status_text = create_progress_bar(len(chunks))
+                temp_placeholder = st.empty()
                 
-                transcript_parts = []
-                previous_chunk_text = ""
-                
-                for i, chunk in enumerate(chunks):
-                    update_progress(progress_bar, status_text, i, len(chunks), f"Transcribing chunk {i+1}")
-                    
-                    # Create context prompt
-                    context_prompt = f"You are listening to: {st.session_state.meeting_description_state}. This is part {i+1} of {len(chunks)}."
-                    if previous_chunk_text:
-                        # Add context from previous chunk
-                        context_words = ' '.join(previous_chunk_text.split()[-50:])
-                        context_prompt += f" The previous part ended with: '{context_words}'"
-                    
-                    # Transcribe chunk
-                    chunk_text = transcribe_chunk(
-                        client=client,
-                        chunk=chunk,
-                        chunk_index=i,
-                        total_chunks=len(chunks),
-                        model=model_choice,
-                        language=st.session_state.language_state,
-                        context_prompt=context_prompt
-                    )
-                    
-                    transcript_parts.append(chunk_text)
-                    previous_chunk_text = chunk_text
+                # Chunks are streamed concurrently (see config.transcription.max_concurrency)
+                transcript_parts = transcribe_chunks_concurrently(
+                    chunks=chunks,
+                    model=model_choice,
+                    language=st.session_state.language_state,
+                    description=st.session_state.meeting_description_state,
+                    # Throttled so streaming deltas don't flood the browser with redraws
+                    on_progress=throttled(lambda done, total: update_progress(
+                        progress_bar, status_text, done, total, "Transcribed chunks"
+                    )),
+                    on_partial=throttled(lambda text: temp_placeholder.markdown(
+                        f"**Live Transcription:**\n```\n{text}\n```"
+                    )),
+                    # Unchanged audio and settings reuse earlier chunk transcripts, across sessions
+                    cache=get_chunk_cache()
+                )
+                temp_placeholder.empty()
                 
                 # Combine chunks
                 full_transcript = " ".join(transcript_parts)
@@ -255,6 +280,9 @@ if transcribe_button and uploaded_file:
                 st.info("🔄 Streaming transcription...")
                 
                 temp_placeholder = st.empty()
+                show_live = throttled(lambda text: temp_placeholder.markdown(
+                    f"**Live Transcription:**\n```\n{text}\n```"
+                ))
                 streamed_text = ""
                 
                 context_prompt = f"You are listening to: {st.session_state.meeting_description_state}."
@@ -269,15 +297,12 @@ if transcribe_button and uploaded_file:
                 )
                 
                 for event in stream:
-                    chunk = ""
-                    if hasattr(event, 'delta') and event.delta:
-                        chunk = event.delta
-                    elif hasattr(event, 'text') and event.text:
-                        chunk = event.text
-                    
-                    if chunk:
-                        streamed_text += chunk
-                        temp_placeholder.markdown(f"**Live Transcription:**\n```\n{streamed_text}\n```")
+                    if getattr(event, 'type', None) == "transcript.text.done":
+                        # The done event carries the full text, not another delta
+                        streamed_text = event.text or streamed_text
+                    elif getattr(event, 'delta', None):
+                        streamed_text += event.delta
+                        show_live(streamed_text)
                 
                 full_transcript = streamed_text
                 temp_placeholder.empty()
@@ -314,17 +339,22 @@ if st.session_state.transcript:
             with st.expander("📥 Export Options"):
                 export_format = st.selectbox("Format:", ["txt", "md"], key="export_format")
                 if st.button("Download", key="download_transcript"):
-                    export_data = export_transcript(st.session_state.transcript, export_format)
                     st.download_button(
                         label=f"Download {export_format.upper()}",
-                        data=export_data,
+                        data=export_transcript_file(st.session_state.transcript, export_format),
                         file_name=f"transcript_{st.session_state.uploaded_file_name}.{export_format}",
                         mime="text/plain" if export_format == "txt" else "text/markdown"
                     )
     
     # Transcript content
     with st.expander("📖 View Full Transcript", expanded=True):
-        st.code(st.session_state.transcript, language=None)
+        # Long transcripts are cut short here; the full text is in the editor and export
+        preview_chars = config.ui.transcript_preview_chars
+        st.text(
+            st.session_state.transcript[:preview_chars]
+            + ("… (truncated, use Download for the full transcript)"
+               if len(st.session_state.transcript) > preview_chars else "")
+        )
     
     # Transcript editor section
     st.subheader("✏️ Edit Transcript")
@@ -351,17 +381,21 @@ if st.session_state.edited_transcript:
             help="Create structured meeting notes and extract key insights"
         )
     
-    if generate_summary_button:
+    if generate_summary_button and batch_mode:
+        # Never reset, so ids stay unique across batches and results don't overwrite each other
+        st.session_state.batch_request_count += 1
+        st.session_state.batch_requests.append(build_summary_batch_request(
+            custom_id=f"summary-{st.session_state.batch_request_count}-{st.session_state.uploaded_file_name}",
+            model=config.summary_model,
+            instructions=get_summary_prompt(),
+            transcript=st.session_state.edited_transcript
+        ))
+        st.success("📥 Summary queued for the next batch")
+    
+    elif generate_summary_button:
         try:
             with st.spinner("🤖 Generating intelligent summary..."):
-                audio_description = f"Meeting description: {st.session_state.meeting_description_state}"
-                language_name = config.get_language_display_name(st.session_state.language_state)
-                
-                formatted_prompt = SYSTEM_PROMPT.format(
-                    audio_description=audio_description,
-                    transcript=st.session_state.edited_transcript,
-                    language=language_name
-                )
+                formatted_prompt = get_summary_prompt()
                 
                 response = client.responses.create(
                     model=config.summary_model,
@@ -390,14 +424,53 @@ if st.session_state.summary:
     with col2:
         with st.expander("📥 Export Summary"):
             if st.button("Download Summary", key="download_summary"):
-                summary_data = st.session_state.summary.encode('utf-8')
                 st.download_button(
                     label="Download MD",
-                    data=summary_data,
+                    data=BytesIO(st.session_state.summary.encode('utf-8')),
                     file_name=f"summary_{st.session_state.uploaded_file_name}.md",
                     mime="text/markdown"
                 )
     
     # Summary content
     with st.container():
-        st.markdown(st.session_state.summary)
\ No newline at end of file
+        st.markdown(st.session_state.summary)
+
+# Batch summaries
+if batch_mode:
+    with st.sidebar:
+        st.subheader("📦 Summary Batch")
+        st.caption(f"{len(st.session_state.batch_requests)} summaries queued")
+        
+        if st.button("Submit batch", disabled=not st.session_state.batch_requests):
+            try:
+                st.session_state.batch_ids.append(submit_summary_batch(client, st.session_state.batch_requests))
+                st.session_state.batch_requests = []
+            except Exception as e:
+                st.error(f"❌ Batch submission failed: {e}")
+                logger.error(f"Batch submission error: {e}")
+        
+        for batch_id in st.session_state.batch_ids:
+            st.caption(f"Batch: {batch_id}")
+        
+        if st.session_state.batch_ids and st.button("Check batch status"):
+            for batch_id in list(st.session_state.batch_ids):
+                try:
+                    status, summaries, errors = fetch_batch_summaries(client, batch_id)
+                except Exception as e:
+                    st.error(f"❌ Batch check failed: {e}")
+                    logger.error(f"Batch check error: {e}")
+                    continue
+                
+                st.info(f"{batch_id}: {status}")
+                if summaries is not None:
+                    # Terminal state: keep what came back and stop polling
+                    st.session_state.batch_summaries.update(summaries)
+                    st.session_state.batch_errors.update(errors)
+                    st.session_state.batch_ids.remove(batch_id)
+    
+    for custom_id, summary in st.session_state.batch_summaries.items():
+        with st.expander(f"📊 {custom_id}"):
+            st.markdown(summary)
+    
+    for custom_id, error in st.session_state.batch_errors.items():
+        st.warning(f"⚠️ {custom_id}: {error}")
@@ -3,8 +3,9 @@ Configuration module for the Audio Transcription App.
 Centralizes all settings and environment variables.
 """
 import os
+from types import MappingProxyType
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Mapping
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,6 +18,9 @@ class TranscriptionConfig:
     chunk_overlap_seconds: int = 5   # Overlap between chunks
     silence_padding_ms: int = 100    # Silence added at the beginning
     max_file_size_mb: int = 25       # OpenAI API limit
+    frame_rate: int = 16000          # Sample rate chunks are uploaded at
+    max_concurrency: int = 5         # Chunk requests in flight at once
+    chunk_cache_entries: int = 512   # Chunk transcripts kept per process
 
 @dataclass
 class UIConfig:
@@ -26,6 +30,7 @@ class UIConfig:
     default_language: str = "it"
     default_model: str = "gpt-4o-transcribe"
     default_description: str = "A conversation about ..."
+    transcript_preview_chars: int = 10_000  # Characters shown in the transcript viewer
 
 @dataclass
 class SupportedFormats:
@@ -61,6 +66,11 @@ class AppConfig:
         self.formats = SupportedFormats()
         self.languages = LanguageConfig()
         
+        # Read-only language lookup, resolved once; st.selectbox's format_func
+        # calls get_language_display_name for every option on every rerun
+        self._language_names = MappingProxyType(self.languages.supported_languages)
+        self._language_options = list(self._language_names)
+        
         # API Configuration
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.summary_model = os.getenv("SUMMARY_MODEL", "gpt-4.1-mini")
@@ -80,16 +90,16 @@ class AppConfig:
     @property
     def language_options(self) -> List[str]:
         """Get list of supported language codes."""
-        return list(self.languages.supported_languages.keys())
+        return self._language_options
     
     @property
-    def language_display_map(self) -> Dict[str, str]:
+    def language_display_map(self) -> Mapping[str, str]:
         """Get mapping of language codes to display names."""
-        return self.languages.supported_languages
+        return self._language_names
     
     def get_language_display_name(self, code: str) -> str:
         """Get display name for a language code."""
-        return self.languages.supported_languages.get(code, code)
+        return self._language_names.get(code, code)
 
 # Global configuration instance
 config = AppConfig() 
\ No newline at end of file
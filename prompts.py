@@ -1,3 +1,5 @@
+from string import Formatter
+
 SYSTEM_PROMPT = """
 # Role and Objective
 You are an AI assistant that analyzes audio transcripts and creates comprehensive, well-structured notes with key insights. Your goal is to transform spoken content into clear, actionable written summaries that capture the essence and important details of the original audio.
@@ -79,4 +81,13 @@ First, analyze the transcript to understand:
 4. **Key Elements**: What are the most important points, decisions, or insights?
 
 Then, create comprehensive notes with an appropriate structure and extract the most valuable insights.
-"""
\ No newline at end of file
+"""
+
+# Split the template into (literal, field) pairs once at import, so building
+# a prompt only joins the pieces instead of re-parsing the whole template.
+_SYSTEM_PROMPT_PARTS = [(literal, field) for literal, field, _, _ in Formatter().parse(SYSTEM_PROMPT)]
+
+def build_prompt(audio_description, transcript, language):
+    """Fill SYSTEM_PROMPT; same result as SYSTEM_PROMPT.format(...)."""
+    values = {"audio_description": audio_description, "transcript": transcript, "language": language}
+    return "".join(literal + (values[field] if field else "") for literal, field in _SYSTEM_PROMPT_PARTS)
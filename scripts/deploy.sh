@@ -67,7 +67,7 @@ if [ "$PACKAGE_MANAGER" = "uv" ]; then
         uv sync --no-install-project
     fi
 else
-    python3 -m pip install openai pydub python-dotenv streamlit
+    python3 -m pip install openai "httpx[http2]" pydub python-dotenv streamlit
     if [ "$1" = "--dev" ]; then
         python3 -m pip install pytest pytest-mock black ruff
         print_status "Development dependencies installed"
@@ -1,54 +1,105 @@
 """
 Unit tests for utility functions.
 """
+import asyncio
+import json
+import wave
+import hashlib
+import httpx
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, AsyncMock, patch
 from io import BytesIO
+from collections import OrderedDict
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils import validate_audio_file, estimate_processing_time, export_transcript
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+from utils import (
+    retry_with_exponential_backoff,
+    validate_audio_file,
+    estimate_processing_time,
+    export_transcript,
+    export_transcript_file,
+    init_session_state,
+    probe_duration_seconds,
+    hash_upload_chunked,
+    preprocess_audio,
+    tail_words,
+    transcription_text,
+    plan_chunk_spans,
+    create_smart_chunks,
+    detect_silence_midpoints,
+    _chunk_to_wav_bytes,
+    transcribe_chunks_async,
+    fetch_batch_summaries,
+    throttled,
+    remember_chunk_transcript,
+    lookup_chunk_transcript,
+)
+
+class TestRetryWithExponentialBackoff:
+    """Test the retry decorator."""
+    
+    def test_retries_sync_function(self):
+        """Test that a failing function is retried until it succeeds."""
+        func = Mock(side_effect=[RuntimeError("boom"), "ok"], __name__="func")
+        assert retry_with_exponential_backoff(initial_delay=0)(func)() == "ok"
+        assert func.call_count == 2
+    
+    def test_retries_async_function(self):
+        """Test that async functions are awaited and retried."""
+        func = AsyncMock(side_effect=[RuntimeError("boom"), "ok"], __name__="func")
+        wrapped = retry_with_exponential_backoff(initial_delay=0)(func)
+        assert asyncio.run(wrapped()) == "ok"
+        assert func.await_count == 2
+    
+    def test_async_gives_up_after_max_retries(self):
+        """Test that the last async failure is raised."""
+        func = AsyncMock(side_effect=RuntimeError("boom"), __name__="func")
+        wrapped = retry_with_exponential_backoff(max_retries=2, initial_delay=0)(func)
+        with pytest.raises(RuntimeError):
+            asyncio.run(wrapped())
+        assert func.await_count == 3
 
 class TestValidateAudioFile:
     """Test audio file validation."""
     
-    def test_validate_none_file(self):
-        """Test validation with None file."""
-        is_valid, error = validate_audio_file(None)
-        assert not is_valid
-        assert error == "No file uploaded"
-    
-    def test_validate_file_too_large(self):
-        """Test validation with oversized file."""
-        mock_file = Mock()
-        mock_file.getvalue.return_value = b"x" * (30 * 1024 * 1024)  # 30MB
-        mock_file.name = "test.mp3"
+    @pytest.mark.parametrize("name, size, expected_valid, error_fragment", [
+        (None, None, False, "No file uploaded"),
+        ("test.mp3", 30 * 1024 * 1024, False, "exceeds limit"),  # 30MB
+        ("test.xyz", 9, False, "Unsupported file format"),
+        ("test.mp3", 9, True, None),
+    ])
+    def test_validate_audio_file(self, name, size, expected_valid, error_fragment):
+        """Test validation of missing, oversized, unsupported and valid files."""
+        mock_file = None
+        if name is not None:
+            # Only name and size: reading the upload (getvalue/read) would raise
+            mock_file = Mock(spec=["name", "size"])
+            mock_file.size = size
+            mock_file.name = name
         
         is_valid, error = validate_audio_file(mock_file)
-        assert not is_valid
-        assert "exceeds limit" in error
-    
-    def test_validate_unsupported_format(self):
-        """Test validation with unsupported format."""
-        mock_file = Mock()
-        mock_file.getvalue.return_value = b"test data"
-        mock_file.name = "test.xyz"
+        assert is_valid == expected_valid
+        if error_fragment is None:
+            assert error is None
+        else:
+            assert error_fragment in error
+
+    def test_size_falls_back_to_seeking(self):
+        """Test that files without a size attribute are measured by seeking, not reading."""
+        audio_file = BytesIO(b"x" * (30 * 1024 * 1024))  # 30MB
+        audio_file.name = "test.mp3"
+        audio_file.seek(10)
         
-        is_valid, error = validate_audio_file(mock_file)
+        is_valid, error = validate_audio_file(audio_file)
         assert not is_valid
-        assert "Unsupported file format" in error
-    
-    def test_validate_valid_file(self):
-        """Test validation with valid file."""
-        mock_file = Mock()
-        mock_file.getvalue.return_value = b"test data"
-        mock_file.name = "test.mp3"
-        
-        is_valid, error = validate_audio_file(mock_file)
-        assert is_valid
-        assert error is None
+        assert "exceeds limit" in error
+        assert audio_file.tell() == 10
 
 class TestEstimateProcessingTime:
     """Test processing time estimation."""
@@ -83,6 +134,336 @@ class TestExportTranscript:
         """Test exporting with unsupported format."""
         with pytest.raises(ValueError):
             export_transcript("test", "pdf")
+    
+    def test_export_file_matches_bytes(self):
+        """Test that the buffer export has the same content as the bytes export."""
+        for export_format in ("txt", "md"):
+            buffer = export_transcript_file("Hello world", export_format)
+            assert buffer.read() == export_transcript("Hello world", export_format)
+
+class TestProbeDurationSeconds:
+    """Test header-based duration probing."""
+    
+    def test_parses_ffprobe_output(self):
+        """Test that ffprobe's duration output is parsed."""
+        with patch("utils.subprocess.run") as mock_run:
+            mock_run.return_value.stdout = b"612.345000\n"
+            assert probe_duration_seconds(b"audio") == pytest.approx(612.345)
+    
+    def test_missing_ffprobe_returns_none(self):
+        """Test that a missing ffprobe binary falls back to None."""
+        with patch("utils.subprocess.run", side_effect=FileNotFoundError("ffprobe")):
+            assert probe_duration_seconds(b"audio") is None
+
+class TestHashUploadChunked:
+    """Test streaming upload hashing."""
+    
+    def test_matches_whole_file_hash(self):
+        """Test that block-wise hashing matches hashing the bytes at once and rewinds."""
+        data = b"audio" * 1000
+        upload = BytesIO(data)
+        digest = hash_upload_chunked(upload, block_size=64)
+        assert digest == hashlib.blake2b(data, digest_size=16).hexdigest()
+        assert upload.tell() == 0
+
+class TestPreprocessAudio:
+    """Test audio preprocessing."""
+    
+    @staticmethod
+    def preprocess(audio):
+        with patch("utils.AudioSegment.from_file", return_value=audio):
+            return preprocess_audio(b"audio")
+    
+    def test_pads_audio_that_starts_loud(self):
+        """Test that speech right at the start gets leading silence."""
+        tone = Sine(440, sample_rate=16000).to_audio_segment(duration=1000, volume=-10)
+        audio = self.preprocess(tone)
+        assert len(audio) == 1000 + 100
+        assert (audio.frame_rate, audio.channels, audio.sample_width) == (16000, 1, 2)
+    
+    def test_skips_padding_when_already_quiet(self):
+        """Test that a recording opening with a pause is left unpadded."""
+        tone = Sine(440, sample_rate=16000).to_audio_segment(duration=1000, volume=-10)
+        quiet_start = AudioSegment.silent(duration=600, frame_rate=16000) + tone
+        assert len(self.preprocess(quiet_start)) == 1600
+
+class TestInitSessionState:
+    """Test shared session state initialization."""
+    
+    def test_fills_missing_defaults(self):
+        """Test that missing keys get their defaults."""
+        with patch("utils.st") as mock_st:
+            mock_st.session_state = {}
+            init_session_state()
+        assert mock_st.session_state["transcript"] is None
+        assert mock_st.session_state["processing"] is False
+    
+    def test_keeps_existing_values(self):
+        """Test that values already in session state are not overwritten."""
+        with patch("utils.st") as mock_st:
+            mock_st.session_state = {"language_state": "en"}
+            init_session_state()
+        assert mock_st.session_state["language_state"] == "en"
+
+class TestCreateSmartChunks:
+    """Test chunking of long audio."""
+    
+    def test_chunks_cover_audio_with_overlap(self):
+        """Test that chunking overlaps neighbours and stops at the end of the audio."""
+        audio = AudioSegment.silent(duration=25000, frame_rate=16000)
+        with patch("utils.config") as mock_config:
+            mock_config.transcription.chunk_overlap_seconds = 1
+            chunks = create_smart_chunks(audio, 10000)
+        assert [len(chunk) for chunk in chunks] == [10000, 11000, 6000]
+    
+    def test_hard_cuts_overlap_once(self):
+        """Test that a chunk after a hard cut repeats only chunk_overlap_seconds of its predecessor."""
+        tone = Sine(440, sample_rate=16000).to_audio_segment(duration=25000, volume=-10)
+        with patch("utils.config") as mock_config:
+            mock_config.transcription.chunk_overlap_seconds = 5
+            spans = plan_chunk_spans(tone, 10000)
+        assert spans == [(0, 10000), (5000, 20000), (15000, 25000)]
+    
+    def test_splits_at_pauses(self):
+        """Test that chunks end in the middle of pauses rather than at the hard limit."""
+        tone = Sine(440, sample_rate=16000).to_audio_segment(duration=4000, volume=-10)
+        pause = AudioSegment.silent(duration=1000, frame_rate=16000)
+        audio = tone + pause + tone + pause + tone
+        assert detect_silence_midpoints(audio) == [4500, 9500]
+        assert plan_chunk_spans(audio, 6000) == [(0, 4500), (4500, 9500), (9500, 14000)]
+        assert [len(chunk) for chunk in create_smart_chunks(audio, 6000)] == [4500, 5000, 4500]
+    
+    def test_chunks_share_the_decoded_buffer(self):
+        """Test that chunks are views into the original PCM rather than copies."""
+        audio = AudioSegment.silent(duration=25000, frame_rate=16000)
+        chunks = create_smart_chunks(audio, 10000)
+        assert all(chunk.raw_data.obj is audio.raw_data for chunk in chunks)
+
+class TestChunkToWavBytes:
+    """Test WAV encoding of chunks."""
+    
+    def test_wav_round_trips_through_wave(self):
+        """Test that the hand-built header describes the chunk's PCM."""
+        chunk = AudioSegment.silent(duration=250, frame_rate=16000)
+        with wave.open(BytesIO(_chunk_to_wav_bytes(chunk))) as wav:
+            assert wav.getframerate() == 16000
+            assert wav.getnchannels() == 1
+            assert wav.getsampwidth() == 2
+            assert wav.readframes(wav.getnframes()) == chunk.raw_data
+
+class TestTailWords:
+    """Test trailing-word context extraction."""
+    
+    def test_short_text_keeps_all_words(self):
+        """Test that text shorter than the limit comes back whole."""
+        assert tail_words("  hello   there world ", 50) == "hello there world"
+    
+    def test_long_text_matches_full_split(self):
+        """Test that the bounded slice gives the same words as a full split."""
+        text = " ".join(f"word{i}" for i in range(1000))
+        assert tail_words(text, 50) == " ".join(text.split()[-50:])
+    
+    def test_drops_word_cut_by_slice(self):
+        """Test that a word cut in half by the slice is not returned."""
+        text = "x" * 100 + " end"
+        assert tail_words(text, 2) == "end"
+
+class TestChunkTranscriptCache:
+    """Test the chunk transcript LRU."""
+    
+    def test_evicts_least_recently_used(self):
+        """Test that lookups protect entries from eviction."""
+        cache = OrderedDict()
+        with patch("utils.config") as mock_config:
+            mock_config.transcription.chunk_cache_entries = 2
+            remember_chunk_transcript(cache, "a", "first")
+            remember_chunk_transcript(cache, "b", "second")
+            assert lookup_chunk_transcript(cache, "a") == "first"
+            remember_chunk_transcript(cache, "c", "third")
+        assert list(cache) == ["a", "c"]
+
+class TestTranscriptionText:
+    """Test transcription response text extraction."""
+    
+    def test_text_format_is_returned_as_is(self):
+        """Test that plain string responses pass through."""
+        assert transcription_text("hello") == "hello"
+    
+    def test_json_format_uses_text_field(self):
+        """Test that object responses give their .text rather than a repr."""
+        assert transcription_text(Mock(text="hello")) == "hello"
+        assert transcription_text(None) == ""
+
+class TestTranscribeChunksAsync:
+    """Test concurrent chunk transcription."""
+    
+    @staticmethod
+    def make_client(texts, delays):
+        in_flight = {"now": 0, "max": 0}
+        prompts = []
+        
+        async def create(**kwargs):
+            index = int(kwargs["file"][0].split("_")[1].split(".")[0]) - 1
+            prompts.append(kwargs["prompt"])
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(delays[index])
+            in_flight["now"] -= 1
+            
+            async def events():
+                for word in texts[index].split(" "):
+                    yield Mock(type="transcript.text.delta", delta=word + " ")
+                yield Mock(type="transcript.text.done", text=texts[index])
+            return events()
+        
+        client = Mock()
+        client.audio.transcriptions.create = AsyncMock(side_effect=create)
+        return client, in_flight, prompts
+    
+    def run(self, client, chunks, max_concurrency, on_progress=None, on_partial=None, cache=None):
+        return asyncio.run(transcribe_chunks_async(
+                client, chunks, "gpt-4o-transcribe", "en", "a test", max_concurrency,
+                on_progress, on_partial, cache
+            ))
+    
+    def test_results_keep_chunk_order(self):
+        """Test that results come back in chunk order regardless of completion order."""
+        chunks = [AudioSegment.silent(duration=10)] * 3
+        client, _, _ = self.make_client(["one", "two", "three"], [0.03, 0.02, 0.01])
+        assert self.run(client, chunks, 3) == ["one", "two", "three"]
+    
+    def test_concurrency_is_bounded(self):
+        """Test that no more than max_concurrency requests run at once."""
+        chunks = [AudioSegment.silent(duration=10)] * 6
+        client, in_flight, _ = self.make_client(["text"] * 6, [0.01] * 6)
+        progress = []
+        self.run(client, chunks, 2, lambda done, total: progress.append((done, total)))
+        assert in_flight["max"] == 2
+        assert progress[-1] == (6, 6)
+    
+    def test_finished_neighbor_adds_context(self):
+        """Test that a chunk starting after its predecessor finished gets its closing words."""
+        chunks = [AudioSegment.silent(duration=10)] * 2
+        client, _, prompts = self.make_client(["hello there", "again"], [0, 0])
+        self.run(client, chunks, 1)
+        assert "previous part ended with: 'hello there'" in prompts[1]
+    
+    def test_cached_chunks_skip_the_api(self):
+        """Test that a second run over the same chunks is served from the cache."""
+        chunks = [AudioSegment.silent(duration=10), AudioSegment.silent(duration=20)]
+        client, _, _ = self.make_client(["one", "two"], [0, 0])
+        cache = OrderedDict()
+        self.run(client, chunks, 2, cache=cache)
+        assert self.run(client, chunks, 2, cache=cache) == ["one", "two"]
+        assert client.audio.transcriptions.create.await_count == 2
+    
+    def test_dropped_stream_is_retried(self):
+        """Test that a stream failing mid-way is requested again instead of failing the run."""
+        chunks = [AudioSegment.silent(duration=10)]
+        client, _, _ = self.make_client(["hello there"], [0])
+        create = client.audio.transcriptions.create.side_effect
+        
+        async def dropped(**kwargs):
+            async def events():
+                yield Mock(type="transcript.text.delta", delta="hel")
+                raise httpx.ReadError("connection lost")
+            return events()
+        
+        attempts = iter([dropped, create])
+        
+        async def next_attempt(**kwargs):
+            return await next(attempts)(**kwargs)
+        
+        client.audio.transcriptions.create = AsyncMock(side_effect=next_attempt)
+        with patch("utils.asyncio.sleep", AsyncMock()):
+            assert self.run(client, chunks, 1) == ["hello there"]
+        assert client.audio.transcriptions.create.await_count == 2
+    
+    def test_partial_text_stays_in_order(self):
+        """Test that streamed text is only shown once every earlier chunk has finished."""
+        chunks = [AudioSegment.silent(duration=10)] * 2
+        client, _, _ = self.make_client(["first part", "second part"], [0.03, 0])
+        partials = []
+        self.run(client, chunks, 2, on_partial=partials.append)
+        assert all(text.startswith("first") for text in partials)
+        assert partials[-1] == "first part second part"
+
+class TestThrottled:
+    """Test UI callback throttling."""
+    
+    def test_drops_calls_within_interval(self):
+        """Test that only the first call in an interval goes through."""
+        callback = Mock(__name__="callback")
+        wrapped = throttled(callback, min_interval_s=60)
+        for i in range(5):
+            wrapped(i)
+        callback.assert_called_once_with(0)
+    
+    def test_calls_again_after_interval(self):
+        """Test that calls resume once the interval has passed."""
+        callback = Mock(__name__="callback")
+        wrapped = throttled(callback, min_interval_s=1)
+        with patch("utils.time.monotonic", side_effect=[10.0, 10.5, 11.5]):
+            wrapped(1)
+            wrapped(2)
+            wrapped(3)
+        assert [c.args for c in callback.call_args_list] == [(1,), (3,)]
+
+class TestFetchBatchSummaries:
+    """Test reading summary batch results."""
+    
+    @staticmethod
+    def make_client(status, output_file_id=None, error_file_id=None, files=None, errors=None):
+        client = Mock()
+        client.batches.retrieve.return_value = Mock(
+            status=status, output_file_id=output_file_id, error_file_id=error_file_id, errors=errors
+        )
+        client.files.content.side_effect = lambda file_id: Mock(
+            text="\n".join(json.dumps(line) for line in files[file_id])
+        )
+        return client
+    
+    def test_pending_batch_has_no_results(self):
+        """Test that an unfinished batch only reports its status."""
+        client = self.make_client("in_progress")
+        assert fetch_batch_summaries(client, "batch_1") == ("in_progress", None, {})
+    
+    def test_completed_batch_maps_output_text(self):
+        """Test that output text is collected per custom_id."""
+        line = {
+            "custom_id": "summary-1-call.mp3",
+            "response": {"status_code": 200, "body": {"output": [
+                {"type": "reasoning"},
+                {"type": "message", "content": [{"type": "output_text", "text": "# Notes"}]}
+            ]}}
+        }
+        client = self.make_client("completed", output_file_id="file_1", files={"file_1": [line]})
+        status, summaries, errors = fetch_batch_summaries(client, "batch_1")
+        assert status == "completed"
+        assert summaries == {"summary-1-call.mp3": "# Notes"}
+        assert errors == {}
+    
+    def test_failed_requests_are_reported(self):
+        """Test that error-file lines and non-200 responses become errors."""
+        files = {
+            "file_out": [{"custom_id": "summary-1", "response": {
+                "status_code": 400, "body": {"error": {"message": "Bad prompt"}}
+            }}],
+            "file_err": [{"custom_id": "summary-2", "error": {"code": "timeout", "message": "Timed out"}}],
+        }
+        client = self.make_client("expired", output_file_id="file_out", error_file_id="file_err", files=files)
+        status, summaries, errors = fetch_batch_summaries(client, "batch_1")
+        assert status == "expired"
+        assert summaries == {}
+        assert errors == {"summary-1": "Bad prompt", "summary-2": "Timed out"}
+    
+    def test_failed_batch_reports_batch_errors(self):
+        """Test that a batch rejected before running still finishes with an error."""
+        batch_errors = Mock(data=[Mock(code="invalid_json", message="Line 1 is not valid JSON")])
+        client = self.make_client("failed", errors=batch_errors)
+        assert fetch_batch_summaries(client, "batch_1") == (
+            "failed", {}, {"batch_1": "Line 1 is not valid JSON"}
+        )
 
 if __name__ == "__main__":
     pytest.main([__file__]) 
\ No newline at end of file
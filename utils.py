@@ -2,25 +2,136 @@
 Utility functions for the Audio Transcription App.
 Includes error handling, audio processing, and file validation.
 """
+from __future__ import annotations
+
 import os
+import json
 import time
+import bisect
+import random
+import hashlib
+import asyncio
 import logging
-from typing import Optional, Tuple, List, Generator
+import struct
+import subprocess
+import threading
+from typing import TYPE_CHECKING, Optional, Tuple, List, Generator, Callable, MutableMapping
 from io import BytesIO
 from functools import wraps
+from collections import OrderedDict
 
+import httpx
 import streamlit as st
 from pydub import AudioSegment
-from openai import OpenAI
 
 from config import config
 
-# Set up logging
-logging.basicConfig(
-    level=getattr(logging, config.log_level),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+if TYPE_CHECKING:
+    # openai is imported lazily in the client factories below
+    from openai import OpenAI, AsyncOpenAI
+
+# Set up logging (the root logger is configured by the app entrypoints, see _init_logging)
 logger = logging.getLogger(__name__)
+_LOG_INIT = False
+
+def _init_logging():
+    """Configure root logging once, and only if nothing else has configured it."""
+    global _LOG_INIT
+    if _LOG_INIT:
+        return
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=getattr(logging, config.log_level),
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+    _LOG_INIT = True
+
+# Connection pool limits shared by the sync and async OpenAI clients
+HTTP_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=16)
+
+@st.cache_resource
+def get_openai_client() -> OpenAI:
+    """
+    Get the shared OpenAI client.
+    
+    Cached once per process, so every app entrypoint and script rerun reuses
+    the same keep-alive HTTP/2 connection pool.
+    
+    Returns:
+        OpenAI client
+    """
+    _init_logging()
+    from openai import OpenAI, DefaultHttpxClient
+    
+    client = OpenAI(
+        api_key=config.openai_api_key,
+        http_client=DefaultHttpxClient(http2=True, limits=HTTP_LIMITS)
+    )
+    
+    # Open the TLS connection in the background so the first real request
+    # doesn't pay for the handshake
+    threading.Thread(target=_warm_up_connection, args=(client,), daemon=True).start()
+    return client
+
+def _warm_up_connection(client: OpenAI):
+    """Make a cheap request to open the client's keep-alive connection."""
+    try:
+        client.with_options(timeout=5, max_retries=0).models.list()
+    except Exception as e:
+        logger.debug(f"OpenAI connection warm-up failed: {e}")
+
+def create_async_openai_client() -> AsyncOpenAI:
+    """
+    Create an async OpenAI client for concurrent chunk transcription.
+    
+    Not cached like get_openai_client(): the client is bound to the event loop
+    it is used on, so a new one is opened for each asyncio.run() batch. SDK
+    retries are off: transcribe_chunk_async() retries the whole request
+    including the stream, which the SDK's retries don't cover. HTTP/2 lets the
+    concurrent chunk uploads share one TLS connection.
+    
+    Returns:
+        AsyncOpenAI client
+    """
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    
+    return AsyncOpenAI(
+        api_key=config.openai_api_key,
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(
+            http2=True,
+            limits=HTTP_LIMITS,
+            timeout=httpx.Timeout(600, connect=10)
+        )
+    )
+
+def init_session_state():
+    """Initialize session state variables shared by the app entrypoints."""
+    _init_logging()
+    defaults = {
+        'transcript': None,
+        'summary': None,
+        'edited_transcript': None,
+        'uploaded_file_name': None,
+        'audio_bytes': None,
+        'audio_bytes_key': None,
+        'audio_hash': None,
+        'audio_duration': None,
+        'batch_requests': [],
+        'batch_request_count': 0,
+        'batch_ids': [],
+        'batch_summaries': {},
+        'batch_errors': {},
+        'summary_prompt': None,
+        'summary_prompt_key': None,
+        'meeting_description_state': config.ui.default_description,
+        'language_state': config.ui.default_language,
+        'processing': False
+    }
+    
+    for key, value in defaults.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
 
 def retry_with_exponential_backoff(
     max_retries: int = 3,
@@ -31,36 +142,61 @@ def retry_with_exponential_backoff(
     """
     Decorator to retry functions with exponential backoff.
     
+    Works on both regular and async functions.
+    
     Args:
         max_retries: Maximum number of retry attempts
         initial_delay: Initial delay in seconds
         exponential_base: Base for exponential backoff
         jitter: Whether to add random jitter to delays
     """
+    # Backoff schedule, computed once per decorated function
+    base_delays = tuple(initial_delay * (exponential_base ** attempt) for attempt in range(max_retries))
+    
+    def retry_delay(name: str, attempt: int, e: Exception) -> float:
+        if attempt == max_retries:
+            logger.error(f"Function {name} failed after {max_retries} retries: {e}")
+            raise e
+        
+        delay = base_delays[attempt]
+        if jitter:
+            delay *= (0.5 + random.random())
+        
+        logger.warning(f"Attempt {attempt + 1} failed for {name}: {e}. Retrying in {delay:.2f}s")
+        return delay
+    
     def decorator(func):
+        name = func.__name__
+        
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                for attempt in range(max_retries + 1):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        # asyncio.sleep lets other chunks keep running during the backoff
+                        await asyncio.sleep(retry_delay(name, attempt, e))
+                
+                return None
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
-            import random
-            
             for attempt in range(max_retries + 1):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-                    if attempt == max_retries:
-                        logger.error(f"Function {func.__name__} failed after {max_retries} retries: {e}")
-                        raise
-                    
-                    delay = initial_delay * (exponential_base ** attempt)
-                    if jitter:
-                        delay *= (0.5 + random.random())
-                    
-                    logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}: {e}. Retrying in {delay:.2f}s")
-                    time.sleep(delay)
+                    time.sleep(retry_delay(name, attempt, e))
             
             return None
         return wrapper
     return decorator
 
+# Validation limits, resolved once from config
+_UPLOAD_TYPES = frozenset(upload_type.lower() for upload_type in config.formats.upload_types)
+_MAX_FILE_SIZE_BYTES = int(config.transcription.max_file_size_mb * 1024 * 1024)
+
 def validate_audio_file(uploaded_file) -> Tuple[bool, Optional[str]]:
     """
     Validate uploaded audio file.
@@ -74,18 +210,90 @@ def validate_audio_file(uploaded_file) -> Tuple[bool, Optional[str]]:
     if uploaded_file is None:
         return False, "No file uploaded"
     
-    # Check file size
-    file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
-    if file_size_mb > config.transcription.max_file_size_mb:
+    # Check file size without reading the upload: UploadedFile.size, or seek to the end
+    file_size = getattr(uploaded_file, "size", None)
+    if file_size is None:
+        position = uploaded_file.tell()
+        file_size = uploaded_file.seek(0, os.SEEK_END)
+        uploaded_file.seek(position)
+    if file_size > _MAX_FILE_SIZE_BYTES:
+        file_size_mb = file_size / (1024 * 1024)
         return False, f"File size ({file_size_mb:.1f}MB) exceeds limit of {config.transcription.max_file_size_mb}MB"
     
     # Check file extension
-    file_extension = uploaded_file.name.split('.')[-1].lower()
-    if file_extension not in config.formats.upload_types:
+    file_extension = os.path.splitext(uploaded_file.name)[1][1:].lower()
+    if file_extension not in _UPLOAD_TYPES:
         return False, f"Unsupported file format: {file_extension}"
     
     return True, None
 
+def hash_upload_chunked(file_obj, block_size: int = 8 * 1024 * 1024) -> str:
+    """
+    Hash an upload's content in fixed-size reads.
+    
+    Peak memory is one block regardless of file size. The file position is
+    reset to the start afterwards.
+    
+    Args:
+        file_obj: Binary file-like object (e.g. a Streamlit UploadedFile)
+        block_size: Bytes read per step
+    
+    Returns:
+        Hex digest identifying the upload's content
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    file_obj.seek(0)
+    for block in iter(lambda: file_obj.read(block_size), b""):
+        digest.update(block)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+def probe_duration_seconds(audio_bytes: bytes) -> Optional[float]:
+    """
+    Read the audio duration from the container header with ffprobe.
+    
+    Much cheaper than decoding the whole file just to measure it.
+    
+    Args:
+        audio_bytes: Raw audio file bytes
+    
+    Returns:
+        Duration in seconds, or None if ffprobe is unavailable or can't tell
+    """
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=nw=1:nk=1", "-"],
+            input=audio_bytes,
+            capture_output=True,
+            timeout=30,
+            check=True
+        )
+        return float(result.stdout.strip())
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        logger.warning(f"Could not probe audio duration, falling back to decoding: {e}")
+        return None
+
+# Leading silence, built once in the format preprocess_audio() converts to
+_SILENCE_PADDING = (
+    AudioSegment.silent(
+        duration=config.transcription.silence_padding_ms,
+        frame_rate=config.transcription.frame_rate
+    )
+    if config.transcription.silence_padding_ms else None
+)
+
+def _starts_with_silence(audio: AudioSegment, window_ms: int = 500, silence_thresh_dbfs: float = -50) -> bool:
+    """
+    Check whether audio opens with window_ms of silence.
+    
+    Uses an absolute level so only the window is measured; comparing against
+    audio.dBFS would read the whole file just to decide on 100ms of padding.
+    """
+    if len(audio) <= window_ms:
+        return False
+    return audio[:window_ms].dBFS < silence_thresh_dbfs
+
 def preprocess_audio(audio_bytes: bytes) -> AudioSegment:
     """
     Preprocess audio for better transcription results.
@@ -100,9 +308,17 @@ def preprocess_audio(audio_bytes: bytes) -> AudioSegment:
         # Load audio
         audio = AudioSegment.from_file(BytesIO(audio_bytes))
         
-        # Add silence padding at the beginning
-        silence = AudioSegment.silent(duration=config.transcription.silence_padding_ms)
-        audio = silence + audio
+        # 16 kHz mono 16-bit keeps WAV chunks under the upload limit
+        # (10 minutes is ~19 MB) and is what the models work at anyway
+        audio = (
+            audio.set_frame_rate(config.transcription.frame_rate)
+            .set_channels(1)
+            .set_sample_width(2)
+        )
+        
+        # Add silence padding at the beginning, unless the recording already starts quiet
+        if _SILENCE_PADDING is not None and not _starts_with_silence(audio):
+            audio = _SILENCE_PADDING + audio
         
         # Normalize audio levels (optional - can improve transcription)
         # audio = audio.normalize()
@@ -114,52 +330,224 @@ def preprocess_audio(audio_bytes: bytes) -> AudioSegment:
         logger.error(f"Audio preprocessing failed: {e}")
         raise
 
-def create_smart_chunks(audio: AudioSegment, max_duration_ms: int) -> List[AudioSegment]:
+def _slice_audio(audio: AudioSegment, pcm_view: memoryview, start_ms: int, end_ms: int) -> AudioSegment:
+    """Wrap a millisecond range of audio's PCM in an AudioSegment without copying it."""
+    start_byte = start_ms * audio.frame_rate // 1000 * audio.frame_width
+    end_byte = end_ms * audio.frame_rate // 1000 * audio.frame_width
+    return AudioSegment(
+        data=pcm_view[start_byte:end_byte],
+        sample_width=audio.sample_width,
+        frame_rate=audio.frame_rate,
+        channels=audio.channels
+    )
+
+def detect_silence_midpoints(
+    audio: AudioSegment,
+    min_silence_len: int = 500,
+    silence_thresh_db: float = 16,
+    seek_step_ms: int = 100
+) -> List[int]:
     """
-    Create audio chunks with smart splitting at silence boundaries.
+    Find the midpoints of silent stretches, vectorized with NumPy.
+    
+    Power is summed per seek_step_ms block once, and the mean over every
+    min_silence_len window comes from a cumulative sum, so the cost is one
+    pass over the samples rather than pydub's per-window RMS loop.
+    
+    Args:
+        audio: AudioSegment to scan
+        min_silence_len: Minimum silence length in milliseconds
+        silence_thresh_db: How far below the average level counts as silence
+        seek_step_ms: Resolution of the scan in milliseconds
+    
+    Returns:
+        Sorted silence midpoints in milliseconds (empty if NumPy is unavailable)
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        logger.warning("NumPy not available, skipping silence detection")
+        return []
+    
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}.get(audio.sample_width)
+    step_frames = audio.frame_rate * seek_step_ms // 1000
+    window_steps = max(1, min_silence_len // seek_step_ms)
+    n_steps = int(audio.frame_count()) // step_frames if step_frames else 0
+    if dtype is None or n_steps < window_steps:
+        return []
+    
+    samples = np.frombuffer(audio.raw_data, dtype=dtype)
+    frames = samples[:n_steps * step_frames * audio.channels].reshape(n_steps, -1)
+    # einsum accumulates in float64 without materializing a squared copy of the file
+    step_power = np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / frames.shape[1]
+    
+    # Mean power of every window of window_steps consecutive steps
+    cumulative = np.concatenate(([0.0], np.cumsum(step_power)))
+    window_power = (cumulative[window_steps:] - cumulative[:-window_steps]) / window_steps
+    
+    # The threshold is relative to the average level, like audio.dBFS - 16
+    thresh_power = step_power.mean() * 10 ** (-silence_thresh_db / 10)
+    silent_windows = window_power < thresh_power
+    
+    # Mark every step covered by a silent window, then find the edges of each run
+    covered = np.convolve(silent_windows, np.ones(window_steps, dtype=bool))[:n_steps] > 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], covered.astype(np.int8), [0]))))
+    starts, ends = edges[0::2], edges[1::2]
+    
+    return [int(mid) for mid in (starts + ends) * seek_step_ms // 2]
+
+def plan_chunk_spans(
+    audio: AudioSegment,
+    max_duration_ms: int,
+    seek_step_ms: int = 100
+) -> List[Tuple[int, int]]:
+    """
+    Plan chunk boundaries at silence, without touching the PCM.
+    
+    Each chunk ends at the middle of the last pause in the second half of its
+    window. When there is no such pause it is cut at max_duration_ms and the
+    next chunk overlaps it by config.transcription.chunk_overlap_seconds.
     
     Args:
         audio: AudioSegment to split
         max_duration_ms: Maximum duration per chunk in milliseconds
+        seek_step_ms: Resolution of the silence scan in milliseconds
     
     Returns:
-        List of audio chunks
+        List of (start_ms, end_ms) spans
     """
     if len(audio) <= max_duration_ms:
-        return [audio]
+        return [(0, len(audio))]
     
-    chunks = []
+    spans = []
     overlap_ms = config.transcription.chunk_overlap_seconds * 1000
     
     # Try to find silence boundaries for splitting
     try:
         # Detect silence (you might want to adjust these parameters)
-        silence_thresh = audio.dBFS - 16  # 16dB below average
-        min_silence_len = 500  # 500ms minimum silence
+        split_points = detect_silence_midpoints(
+            audio,
+            min_silence_len=500,  # 500ms minimum silence
+            silence_thresh_db=16,  # 16dB below average
+            seek_step_ms=seek_step_ms
+        )
         
-        # Simple chunking with overlap for now
-        # In a more advanced version, you'd use silence detection
         start = 0
+        carried_overlap = 0  # Only chunks after a hard cut overlap their predecessor
         while start < len(audio):
             end = min(start + max_duration_ms, len(audio))
+            chunk_start = max(0, start - carried_overlap)
             
-            # Add overlap except for the first chunk
-            chunk_start = max(0, start - overlap_ms) if start > 0 else start
-            chunk = audio[chunk_start:end]
+            if end < len(audio):
+                # Latest pause in the second half of this chunk's window
+                index = bisect.bisect_right(split_points, end) - 1
+                if index >= 0 and split_points[index] > start + max_duration_ms // 2:
+                    split = split_points[index]
+                    spans.append((chunk_start, split))
+                    start, carried_overlap = split, 0
+                    continue
             
-            chunks.append(chunk)
-            start = end - overlap_ms
+            spans.append((chunk_start, end))
+            if end == len(audio):
+                break
+            start, carried_overlap = end, overlap_ms
     
     except Exception as e:
         logger.warning(f"Smart chunking failed, using simple chunking: {e}")
         # Fallback to simple chunking
-        chunks = []
-        for i in range(0, len(audio), max_duration_ms):
-            chunks.append(audio[i:i + max_duration_ms])
+        spans = [
+            (i, min(i + max_duration_ms, len(audio)))
+            for i in range(0, len(audio), max_duration_ms)
+        ]
+    
+    return spans
+
+def create_smart_chunks(
+    audio: AudioSegment,
+    max_duration_ms: int,
+    seek_step_ms: int = 100
+) -> List[AudioSegment]:
+    """
+    Create audio chunks with smart splitting at silence boundaries.
+    
+    Chunks are built from plan_chunk_spans() as views into audio's PCM, so
+    no chunk copies its share of the buffer; the only copy is made when a
+    chunk is wrapped for upload.
+    
+    Args:
+        audio: AudioSegment to split
+        max_duration_ms: Maximum duration per chunk in milliseconds
+        seek_step_ms: Resolution of the silence scan in milliseconds
+    
+    Returns:
+        List of audio chunks
+    """
+    spans = plan_chunk_spans(audio, max_duration_ms, seek_step_ms)
+    if len(spans) == 1:
+        return [audio]
+    
+    pcm_view = memoryview(audio.raw_data)
+    chunks = [_slice_audio(audio, pcm_view, start_ms, end_ms) for start_ms, end_ms in spans]
     
     logger.info(f"Created {len(chunks)} chunks from audio")
     return chunks
 
+def _chunk_to_wav_bytes(chunk: AudioSegment) -> bytes:
+    """
+    Wrap a chunk's PCM in a 44-byte WAV header, ready for upload.
+    
+    Replaces an MP3 export, which spawned ffmpeg and ran a lame encode per chunk.
+    
+    Args:
+        chunk: AudioSegment to upload
+    
+    Returns:
+        WAV file bytes
+    """
+    pcm = chunk.raw_data
+    data_size = len(pcm)
+    byte_rate = chunk.frame_rate * chunk.frame_width
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, chunk.channels, chunk.frame_rate, byte_rate,
+        chunk.frame_width, chunk.sample_width * 8,
+        b'data', data_size
+    )
+    return b"".join((header, pcm))
+
+def tail_words(text: str, count: int = 50) -> str:
+    """
+    Return the last count words of text without splitting all of it.
+    
+    Only a bounded slice from the end is split, so the cost doesn't grow with
+    the length of the transcript.
+    
+    Args:
+        text: Text to take the words from
+        count: Number of trailing words to keep
+    
+    Returns:
+        The trailing words joined by single spaces
+    """
+    tail = text[-count * 16:]  # Generous upper bound per word
+    words = tail.split()
+    if len(tail) < len(text) and not tail[0].isspace() and not text[-len(tail) - 1].isspace():
+        # The slice started mid-word; drop the fragment
+        words = words[1:]
+    return ' '.join(words[-count:])
+
+def transcription_text(response) -> str:
+    """
+    Get the text of a transcription response.
+    
+    response_format="text" returns a plain string; the JSON formats return
+    an object with a .text field.
+    """
+    if isinstance(response, str):
+        return response
+    return getattr(response, "text", None) or ""
+
 @retry_with_exponential_backoff(max_retries=3)
 def transcribe_chunk(
     client: OpenAI,
@@ -185,25 +573,367 @@ def transcribe_chunk(
     Returns:
         Transcribed text
     """
-    # Export chunk to bytes
-    chunk_bytes_io = BytesIO()
-    chunk.export(chunk_bytes_io, format="mp3")
-    chunk_bytes_io.seek(0)
-    
     # Create transcription
     response = client.audio.transcriptions.create(
         model=model,
-        file=(f"chunk_{chunk_index + 1}.mp3", chunk_bytes_io),
+        file=(f"chunk_{chunk_index + 1}.wav", _chunk_to_wav_bytes(chunk), "audio/wav"),
         response_format="text",
         language=language if language != "auto" else None,
         prompt=context_prompt
     )
     
-    transcribed_text = str(response) if response else ""
+    transcribed_text = transcription_text(response)
     logger.info(f"Transcribed chunk {chunk_index + 1}/{total_chunks}: {len(transcribed_text)} characters")
     
     return transcribed_text
 
+@retry_with_exponential_backoff(max_retries=3)
+async def transcribe_chunk_async(
+    client: AsyncOpenAI,
+    chunk: AudioSegment,
+    chunk_index: int,
+    total_chunks: int,
+    model: str,
+    language: Optional[str],
+    context_prompt: str,
+    on_delta: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Stream the transcription of a single audio chunk with the async client.
+    
+    Retried as a whole, so a stream dropped mid-way is re-requested rather
+    than failing every chunk in the gather.
+    
+    Args:
+        client: AsyncOpenAI client
+        chunk: AudioSegment to transcribe
+        chunk_index: Index of current chunk (0-based)
+        total_chunks: Total number of chunks
+        model: Model to use for transcription
+        language: Language code (None for auto-detection)
+        context_prompt: Context prompt for transcription
+        on_delta: Optional callback receiving the chunk's text so far
+    
+    Returns:
+        Transcribed text
+    """
+    stream = await client.audio.transcriptions.create(
+        model=model,
+        file=(f"chunk_{chunk_index + 1}.wav", _chunk_to_wav_bytes(chunk), "audio/wav"),
+        response_format="text",
+        language=language if language != "auto" else None,
+        prompt=context_prompt,
+        stream=True
+    )
+    
+    transcribed_text = ""
+    async for event in stream:
+        if getattr(event, 'type', None) == "transcript.text.done":
+            # The done event carries the full text; prefer it over the deltas
+            transcribed_text = event.text or transcribed_text
+        elif getattr(event, 'delta', None):
+            transcribed_text += event.delta
+        else:
+            continue
+        
+        if on_delta:
+            on_delta(transcribed_text)
+    
+    logger.info(f"Transcribed chunk {chunk_index + 1}/{total_chunks}: {len(transcribed_text)} characters")
+    
+    return transcribed_text
+
+def chunk_cache_key(chunk: AudioSegment, model: str, language: Optional[str], description: str) -> str:
+    """
+    Key a chunk transcript by the chunk's audio and the settings that shape it.
+    
+    The previous-chunk context is left out: it depends on completion order,
+    and a chunk whose audio, model, language and description are unchanged
+    transcribes the same either way.
+    
+    Returns:
+        Hex digest identifying the chunk transcript
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(chunk.raw_data)
+    digest.update(f"\0{chunk.frame_rate}\0{chunk.channels}\0{model}\0{language}\0{description}".encode('utf-8'))
+    return digest.hexdigest()
+
+@st.cache_resource
+def get_chunk_cache() -> OrderedDict:
+    """
+    Get the process-wide chunk transcript cache.
+    
+    Shared across sessions, so re-uploading the same audio after a crash or
+    from another tab is served without new API calls. Entries are keyed by
+    chunk_cache_key(), i.e. by the audio itself and the transcription settings.
+    
+    Returns:
+        OrderedDict kept in least-recently-used order
+    """
+    return OrderedDict()
+
+def lookup_chunk_transcript(cache: MutableMapping[str, str], key: str) -> Optional[str]:
+    """Get a cached chunk transcript, marking it as recently used."""
+    text = cache.get(key)
+    if text is not None and isinstance(cache, OrderedDict):
+        try:
+            cache.move_to_end(key)
+        except KeyError:
+            pass  # Evicted by another session in between
+    return text
+
+def remember_chunk_transcript(cache: MutableMapping[str, str], key: str, text: str):
+    """Store a chunk transcript, dropping the least recently used entries past the configured size."""
+    cache[key] = text
+    if isinstance(cache, OrderedDict):
+        while len(cache) > config.transcription.chunk_cache_entries:
+            try:
+                cache.popitem(last=False)
+            except KeyError:
+                break  # Emptied by another session in between
+
+async def transcribe_chunks_async(
+    client: AsyncOpenAI,
+    chunks: List[AudioSegment],
+    model: str,
+    language: Optional[str],
+    description: str,
+    max_concurrency: int,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    on_partial: Optional[Callable[[str], None]] = None,
+    cache: Optional[MutableMapping[str, str]] = None
+) -> List[str]:
+    """
+    Transcribe all chunks concurrently, at most max_concurrency at a time.
+    
+    Chunks start in order. A chunk only gets the previous chunk's closing
+    words as context if that chunk had already finished when it started.
+    Chunks found in cache (see chunk_cache_key()) skip the API call.
+    
+    Args:
+        client: AsyncOpenAI client
+        chunks: AudioSegments to transcribe
+        model: Model to use for transcription
+        language: Language code (None for auto-detection)
+        description: Meeting description used in every context prompt
+        max_concurrency: Maximum number of requests in flight
+        on_progress: Optional callback receiving (completed, total)
+        on_partial: Optional callback receiving the transcript so far: every
+            finished chunk up to the first unfinished one, plus that chunk's
+            streamed text
+        cache: Optional mapping of chunk_cache_key() to transcript, updated
+            with new results (an OrderedDict is kept as an LRU of
+            config.transcription.chunk_cache_entries)
+    
+    Returns:
+        Transcribed texts in chunk order
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    total_chunks = len(chunks)
+    prompt_stem = f"You are listening to: {description}."
+    results: List[Optional[str]] = [None] * total_chunks
+    parts = [""] * total_chunks
+    completed = 0
+    
+    def emit_partial():
+        shown = []
+        for i, part in enumerate(parts):
+            if part:
+                shown.append(part)
+            if results[i] is None:
+                break
+        on_partial(" ".join(shown))
+    
+    def update_part(i: int, text: str):
+        parts[i] = text
+        # Text past the first unfinished chunk can't be shown in order yet
+        if on_partial and all(result is not None for result in results[:i]):
+            emit_partial()
+    
+    async def run(i: int, chunk: AudioSegment) -> str:
+        nonlocal completed
+        text = None
+        if cache is not None:
+            # Hashing a chunk's PCM is CPU-bound; keep it off the event loop
+            key = await asyncio.to_thread(chunk_cache_key, chunk, model, language, description)
+            text = lookup_chunk_transcript(cache, key)
+        
+        if text is None:
+            async with semaphore:
+                context_prompt = f"{prompt_stem} This is part {i+1} of {total_chunks}."
+                previous_text = results[i - 1] if i > 0 else None
+                if previous_text:
+                    context_words = tail_words(previous_text)
+                    context_prompt += f" The previous part ended with: '{context_words}'"
+                
+                text = await transcribe_chunk_async(
+                    client, chunk, i, total_chunks, model, language, context_prompt,
+                    on_delta=lambda partial: update_part(i, partial)
+                )
+            if cache is not None:
+                remember_chunk_transcript(cache, key, text)
+        
+        results[i] = text
+        update_part(i, text)
+        completed += 1
+        if on_progress:
+            on_progress(completed, total_chunks)
+        return text
+    
+    return await asyncio.gather(*(run(i, chunk) for i, chunk in enumerate(chunks)))
+
+def transcribe_chunks_concurrently(
+    chunks: List[AudioSegment],
+    model: str,
+    language: Optional[str],
+    description: str,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    on_partial: Optional[Callable[[str], None]] = None,
+    cache: Optional[MutableMapping[str, str]] = None
+) -> List[str]:
+    """
+    Synchronous entry point for the Streamlit script.
+    
+    Opens an async client and runs transcribe_chunks_async() on a fresh
+    event loop, bounded by config.transcription.max_concurrency.
+    
+    Returns:
+        Transcribed texts in chunk order
+    """
+    async def run_all() -> List[str]:
+        async with create_async_openai_client() as client:
+            return await transcribe_chunks_async(
+                client, chunks, model, language, description,
+                config.transcription.max_concurrency, on_progress, on_partial, cache
+            )
+    
+    return asyncio.run(run_all())
+
+def build_summary_batch_request(
+    custom_id: str,
+    model: str,
+    instructions: str,
+    transcript: str,
+    temperature: float = 0.5
+) -> dict:
+    """
+    Build one Batch API line for a summary request.
+    
+    Mirrors the live client.responses.create() call so batched and
+    interactive summaries are generated the same way.
+    
+    Args:
+        custom_id: Unique id used to match the result back to its file
+        model: Summary model
+        instructions: Formatted system prompt
+        transcript: Transcript passed as input
+        temperature: Sampling temperature
+    
+    Returns:
+        Request dict, one JSONL line of the batch input file
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/responses",
+        "body": {
+            "model": model,
+            "instructions": instructions,
+            "input": transcript,
+            "temperature": temperature
+        }
+    }
+
+def submit_summary_batch(client: OpenAI, requests: List[dict]) -> str:
+    """
+    Upload queued summary requests and start a Batch API job.
+    
+    Args:
+        client: OpenAI client
+        requests: Lines built by build_summary_batch_request()
+    
+    Returns:
+        Batch id
+    """
+    jsonl = "\n".join(json.dumps(request) for request in requests).encode('utf-8')
+    batch_file = client.files.create(file=("summaries.jsonl", jsonl), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/responses",
+        completion_window="24h"
+    )
+    logger.info(f"Submitted summary batch {batch.id} with {len(requests)} requests")
+    return batch.id
+
+# Batch statuses after which the job will not change any more
+BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+def _batch_line_error(result: dict) -> Optional[str]:
+    """Describe why a batch result line failed, or None if it succeeded."""
+    if result.get("error"):
+        error = result["error"]
+        return error.get("message") or error.get("code") or str(error)
+    
+    response = result.get("response") or {}
+    if response.get("status_code") != 200:
+        error = (response.get("body") or {}).get("error") or {}
+        return error.get("message") or f"HTTP {response.get('status_code')}"
+    
+    return None
+
+def fetch_batch_summaries(client: OpenAI, batch_id: str) -> Tuple[str, Optional[dict], dict]:
+    """
+    Check a summary batch and collect its results once it has finished.
+    
+    Any terminal status (completed, failed, expired, cancelled) reads both the
+    output and the error file, so partial results of an expired batch are kept
+    and failed requests are reported instead of dropped.
+    
+    Args:
+        client: OpenAI client
+        batch_id: Id returned by submit_summary_batch()
+    
+    Returns:
+        Tuple of (status, summaries by custom_id or None while the batch is
+        still running, errors by custom_id or by batch_id for batch-level errors)
+    """
+    batch = client.batches.retrieve(batch_id)
+    if batch.status not in BATCH_TERMINAL_STATUSES:
+        return batch.status, None, {}
+    
+    summaries = {}
+    errors = {}
+    if batch.errors and batch.errors.data:
+        # Batch-level failures, e.g. an input file that didn't validate
+        errors[batch_id] = "; ".join(str(error.message or error.code) for error in batch.errors.data)
+    
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            error = _batch_line_error(result)
+            if error:
+                errors[result["custom_id"]] = error
+                continue
+            
+            body = result["response"].get("body") or {}
+            summaries[result["custom_id"]] = "".join(
+                content.get("text", "")
+                for item in body.get("output", [])
+                if item.get("type") == "message"
+                for content in item.get("content", [])
+                if content.get("type") == "output_text"
+            )
+    
+    if not summaries and not errors:
+        errors[batch_id] = f"Batch {batch.status} without any results"
+    
+    return batch.status, summaries, errors
+
 def create_progress_bar(total_chunks: int) -> Tuple[any, any]:
     """
     Create progress bar components for Streamlit.
@@ -218,6 +948,34 @@ def create_progress_bar(total_chunks: int) -> Tuple[any, any]:
     status_text = st.empty()
     return progress_bar, status_text
 
+def throttled(callback: Callable[..., None], min_interval_s: float = 0.1) -> Callable[..., None]:
+    """
+    Wrap a UI callback so it runs at most once per min_interval_s.
+    
+    Calls in between are dropped; the caller is expected to draw the final
+    state itself (e.g. update_progress(..., "Complete!")). The timer lives in
+    the wrapper, so each Streamlit session throttles independently.
+    
+    Args:
+        callback: Function to throttle
+        min_interval_s: Minimum time between calls in seconds
+    
+    Returns:
+        Throttled callback
+    """
+    last_call = float("-inf")
+    
+    @wraps(callback)
+    def wrapper(*args, **kwargs):
+        nonlocal last_call
+        now = time.monotonic()
+        if now - last_call < min_interval_s:
+            return
+        last_call = now
+        callback(*args, **kwargs)
+    
+    return wrapper
+
 def update_progress(
     progress_bar,
     status_text,
@@ -243,6 +1001,27 @@ def update_progress(
     else:
         status_text.text(f"Processing: {current}/{total}")
 
+# Markdown export header, pre-encoded
+_MD_HEADER = b"# Transcript\n\n"
+
+def _txt_export_parts(transcript: str) -> Tuple[bytes, ...]:
+    return (transcript.encode('utf-8'),)
+
+def _md_export_parts(transcript: str) -> Tuple[bytes, ...]:
+    return (_MD_HEADER, transcript.encode('utf-8'))
+
+# Export format -> function returning the encoded parts of the file
+_TRANSCRIPT_EXPORTERS = {
+    "txt": _txt_export_parts,
+    "md": _md_export_parts,
+}
+
+def _transcript_export_parts(transcript: str, format: str) -> Tuple[bytes, ...]:
+    exporter = _TRANSCRIPT_EXPORTERS.get(format)
+    if exporter is None:
+        raise ValueError(f"Unsupported export format: {format}")
+    return exporter(transcript)
+
 def export_transcript(transcript: str, format: str = "txt") -> bytes:
     """
     Export transcript in various formats.
@@ -254,13 +1033,28 @@ def export_transcript(transcript: str, format: str = "txt") -> bytes:
     Returns:
         Exported content as bytes
     """
-    if format == "txt":
-        return transcript.encode('utf-8')
-    elif format == "md":
-        formatted = f"# Transcript\n\n{transcript}"
-        return formatted.encode('utf-8')
-    else:
-        raise ValueError(f"Unsupported export format: {format}")
+    # Join encoded parts rather than building a second copy of the text
+    return b"".join(_transcript_export_parts(transcript, format))
+
+def export_transcript_file(transcript: str, format: str = "txt") -> BytesIO:
+    """
+    Export transcript into a file-like buffer for st.download_button.
+    
+    Writes the header and the encoded text straight into the buffer, so no
+    joined bytes object is built first.
+    
+    Args:
+        transcript: Transcript text
+        format: Export format ("txt", "md", etc.)
+    
+    Returns:
+        BytesIO positioned at the start of the exported content
+    """
+    buffer = BytesIO()
+    for part in _transcript_export_parts(transcript, format):
+        buffer.write(part)
+    buffer.seek(0)
+    return buffer
 
 def estimate_processing_time(audio_duration_seconds: float) -> str:
     """